@@ -1,20 +1,20 @@
 from fastapi import APIRouter, Depends, Header, HTTPException
-import os
-from app.routers import openai
-from app import logger
+from app.routers import openai, ws
+from app.config import get_config
+from app import logger, timing
 
 # Create API router for all endpoints
 api_router = APIRouter(prefix="/oai")
 
 # API key validation
 def validate_api_key(api_key: str = Header(..., description="API key for authentication", alias="X-API-KEY")):
-    valid_keys = os.getenv("PROXY_API_KEYS", "").split(",")
-    if not valid_keys or api_key not in valid_keys:
-        logger.warning(f"Invalid API key attempt: {api_key[:5]}...")
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid or missing API key"
-        )
+    with timing.span("auth"):
+        if api_key not in get_config().api_keys:
+            logger.warning(f"Invalid API key attempt: {api_key[:5]}...")
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid or missing API key"
+            )
     return api_key
 
 # Root endpoint
@@ -46,4 +46,8 @@ def setup_routers():
         dependencies=[Depends(validate_api_key)]
     )
     
+    # WebSocket streams authenticate on the connection itself, since browsers
+    # cannot send the X-API-KEY header with a WebSocket handshake
+    api_router.include_router(ws.router, prefix="/v1")
+    
     return api_router 
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import time
+
+from app import logger
+
+# Sentinel marking the end of the upstream event stream
+_END = object()
+
+def _delta_key(data):
+    """
+    Return the merge key of a chunk carrying only text deltas, or None.
+
+    A chunk is mergeable when it has a single choice without a finish reason
+    whose delta contains nothing but string fields such as `content` or
+    `reasoning_content`. A `role` field is allowed since some providers
+    (e.g. Gemini) repeat it in every chunk; it is part of the key rather
+    than merged. Consecutive chunks merge only if their keys match.
+    """
+    if data.get("usage"):
+        return None
+    choices = data.get("choices")
+    if not isinstance(choices, list) or len(choices) != 1:
+        return None
+    choice = choices[0]
+    if not isinstance(choice, dict) or choice.get("finish_reason") is not None:
+        return None
+    delta = choice.get("delta")
+    if not isinstance(delta, dict) or not all(isinstance(value, str) for value in delta.values()):
+        return None
+    fields = _text_fields(delta)
+    if not fields:
+        return None
+    return (choice.get("index", 0), delta.get("role"), tuple(sorted(fields)))
+
+def _text_fields(delta):
+    """Delta fields whose fragments are concatenated when merging"""
+    return {field: value for field, value in delta.items() if field != "role"}
+
+class DeltaCoalescer:
+    """
+    Merge consecutive text delta chunks into a single chunk.
+
+    The first text delta is always released immediately so the client sees
+    the first token without delay; later deltas accumulate until `flush` is
+    called or `max_bytes` of delta text has been collected.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.pending = None
+        self.key = None
+        self.parts = {}
+        self.size = 0
+        self.started_at = None
+        self.first_sent = False
+        self.last_was_data = False
+
+    def add(self, event):
+        """Add an upstream event and return the events ready to send"""
+        if isinstance(event, str):
+            # Our data frames are self-terminated, so blank separator lines
+            # following them are redundant and would force a flush
+            if event == "\n" and self.last_was_data:
+                return []
+            self.last_was_data = False
+            return self.flush() + [event]
+
+        self.last_was_data = True
+        key = _delta_key(event)
+        if key is None:
+            return self.flush() + [event]
+        if not self.first_sent:
+            # Release everything up to and including the first non-empty token
+            self.first_sent = any(_text_fields(event["choices"][0]["delta"]).values())
+            return self.flush() + [event]
+
+        ready = []
+        if self.pending is not None and key != self.key:
+            ready = self.flush()
+
+        delta = _text_fields(event["choices"][0]["delta"])
+        if self.pending is None:
+            self.pending = event
+            self.key = key
+            self.parts = {field: [value] for field, value in delta.items()}
+            self.size = 0
+            self.started_at = time.monotonic()
+        else:
+            for field, value in delta.items():
+                self.parts[field].append(value)
+        self.size += sum(len(value.encode("utf-8")) for value in delta.values())
+
+        if self.size >= self.max_bytes:
+            ready += self.flush()
+        return ready
+
+    def flush(self):
+        """Release the accumulated chunk, if any"""
+        if self.pending is None:
+            return []
+        chunk = self.pending
+        delta = chunk["choices"][0]["delta"]
+        for field, values in self.parts.items():
+            delta[field] = "".join(values)
+        self.pending = None
+        self.key = None
+        self.parts = {}
+        self.size = 0
+        self.started_at = None
+        return [chunk]
+
+async def coalesce_deltas(events, window_ms, max_bytes):
+    """
+    Coalesce consecutive text deltas of a chat completion stream.
+
+    Upstream events are pumped into a bounded queue by a single task so the
+    upstream connection is never driven from more than one task. Pending
+    deltas are flushed once `window_ms` has elapsed since the first of them
+    arrived, even when the upstream is idle.
+    """
+    window = window_ms / 1000
+    queue = asyncio.Queue(maxsize=64)
+    coalescer = DeltaCoalescer(max_bytes)
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_END)
+
+    producer = asyncio.ensure_future(pump())
+    try:
+        while True:
+            if coalescer.pending is None:
+                event = await queue.get()
+            else:
+                remaining = coalescer.started_at + window - time.monotonic()
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    for ready in coalescer.flush():
+                        yield ready
+                    continue
+
+            if event is _END:
+                break
+            if isinstance(event, Exception):
+                raise event
+            for ready in coalescer.add(event):
+                yield ready
+
+        for ready in coalescer.flush():
+            yield ready
+    finally:
+        if not producer.done():
+            logger.debug("Stream closed early, cancelling upstream")
+            producer.cancel()
@@ -1,11 +1,14 @@
 import os
+import json
+import threading
 from enum import Enum
-from typing import Dict, List, Optional, Union
-from pydantic import BaseModel, Field
-from dotenv import load_dotenv
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict, Field
+from app.env import load_env, read_env
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 class ProviderType(str, Enum):
     OPENAI = "openai"
@@ -13,67 +16,286 @@ class ProviderType(str, Enum):
     ANTHROPIC = "anthropic"
 
 class ProviderConfig(BaseModel):
+    # Validators are built on first use rather than at import; instances are
+    # shared by config snapshots and never modified
+    model_config = ConfigDict(defer_build=True, frozen=True)
+
     api_key: str
     api_endpoint: str
     models: List[str]
     available: bool = Field(default=None)
-    
+
     def __init__(self, **data):
-        super().__init__(**data)
-        if self.available is None:
+        if data.get("available") is None:
             # Automatically determine availability based on API key presence
-            self.available = bool(self.api_key)
-
-# Provider configurations
-PROVIDER_CONFIGS: Dict[ProviderType, Dict[str, ProviderConfig]] = {
-    ProviderType.OPENAI: {
-        "openrouter": ProviderConfig(
-            api_key=os.getenv("OPENROUTER_API_KEY", ""),
-            api_endpoint="https://openrouter.ai/api/v1",
-            models=["openai/gpt-4-turbo", "anthropic/claude-3-opus", "mistral/mistral-large"]
-        ),
-        "deepseek": ProviderConfig(
-            api_key=os.getenv("DEEPSEEK_API_KEY", ""),
-            api_endpoint="https://api.deepseek.com/v1",
-            models=["deepseek-chat", "deepseek-reasoner"]
-        ),
-        "siliconflow": ProviderConfig(
-            api_key=os.getenv("SILICONFLOW_API_KEY", ""),
-            api_endpoint="https://api.siliconflow.cn/v1",
-            models=["deepseek-ai/DeepSeek-R1", "deepseek-ai/DeepSeek-V3", "Qwen/QwQ-32B"]
-        )
+            data["available"] = bool(data.get("api_key"))
+        super().__init__(**data)
+
+# Proxy settings
+REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "60"))
+
+# Export per-request phase timings as OTLP JSON lines to this file; off by
+# default since the file is not rotated
+TIMING_EXPORT_FILE = os.getenv("TIMING_EXPORT_FILE", "")
+
+# Streaming delta coalescing: pending deltas are flushed after the window or byte threshold
+STREAM_COALESCE_WINDOW_MS = int(os.getenv("STREAM_COALESCE_WINDOW_MS", "30"))
+STREAM_COALESCE_MAX_BYTES = int(os.getenv("STREAM_COALESCE_MAX_BYTES", "1024"))
+# Upper bound for any window, including ones requested with X-Stream-Coalesce
+STREAM_COALESCE_MAX_WINDOW_MS = int(os.getenv("STREAM_COALESCE_MAX_WINDOW_MS", "50"))
+
+# Multiplexed WebSocket endpoint limits
+WS_MAX_STREAMS = int(os.getenv("WS_MAX_STREAMS", "8"))
+WS_STREAM_WINDOW = int(os.getenv("WS_STREAM_WINDOW", "64"))
+# Upper bound for a stream's window and outstanding credit
+WS_MAX_STREAM_WINDOW = int(os.getenv("WS_MAX_STREAM_WINDOW", "1024"))
+WS_AUTH_TIMEOUT = float(os.getenv("WS_AUTH_TIMEOUT", "10"))
+
+# Provider/model config file, reloaded on SIGHUP or when its mtime changes
+CONFIG_FILE = os.getenv("PROXY_CONFIG_FILE", "config.json")
+CONFIG_WATCH_INTERVAL = float(os.getenv("CONFIG_WATCH_INTERVAL", "5"))
+
+# Built-in provider/model config, used when CONFIG_FILE does not exist
+DEFAULT_CONFIG = {
+    "providers": {
+        "openai": {
+            "openrouter": {
+                "api_key_env": "OPENROUTER_API_KEY",
+                "api_endpoint": "https://openrouter.ai/api/v1",
+                "models": ["openai/gpt-4-turbo", "anthropic/claude-3-opus", "mistral/mistral-large"]
+            },
+            "deepseek": {
+                "api_key_env": "DEEPSEEK_API_KEY",
+                "api_endpoint": "https://api.deepseek.com/v1",
+                "models": ["deepseek-chat", "deepseek-reasoner"]
+            },
+            "siliconflow": {
+                "api_key_env": "SILICONFLOW_API_KEY",
+                "api_endpoint": "https://api.siliconflow.cn/v1",
+                "models": ["deepseek-ai/DeepSeek-R1", "deepseek-ai/DeepSeek-V3", "Qwen/QwQ-32B"]
+            }
+        },
+        "gemini": {
+            "google_aistudio": {
+                "api_key_env": "GEMINI_AISTUDIO_API_KEY",
+                "api_endpoint": "https://generativelanguage.googleapis.com/v1beta/openai",
+                "models": ["gemini-2.5-pro-preview-03-25", "gemini-2.0-flash", "gemini-2.0-flash-exp", "gemini-2.0-flash-lite"]
+            }
+        },
+        "anthropic": {
+            "anthropic": {
+                "api_key_env": "ANTHROPIC_API_KEY",
+                "api_endpoint": "https://api.anthropic.com/v1",
+                "models": ["claude-3-opus", "claude-3-sonnet", "claude-3-haiku"]
+            }
+        }
     },
-    ProviderType.GEMINI: {
-        "google_aistudio": ProviderConfig(
-            api_key=os.getenv("GEMINI_AISTUDIO_API_KEY", ""),
-            api_endpoint="https://generativelanguage.googleapis.com/v1beta/openai",
-            models=["gemini-2.5-pro-preview-03-25", "gemini-2.0-flash", "gemini-2.0-flash-exp", "gemini-2.0-flash-lite"]
-        )
+    # Generic proxy model names that map to actual provider models
+    "proxy_models": {
+        "gemini-2.0-flash:proxy": {
+            "provider_type": "gemini",
+            "provider": "google_aistudio",
+            "model": "gemini-2.0-flash",
+            "coalesce": True
+        },
+        "deepseek-v3:proxy": {"provider_type": "openai", "provider": "deepseek", "model": "deepseek-chat"},
+        "deepseek-r1:proxy": {"provider_type": "openai", "provider": "deepseek", "model": "deepseek-reasoner"}
     },
-    ProviderType.ANTHROPIC: {
-        "anthropic": ProviderConfig(
-            api_key=os.getenv("ANTHROPIC_API_KEY", ""),
-            api_endpoint="https://api.anthropic.com/v1",
-            models=["claude-3-opus", "claude-3-sonnet", "claude-3-haiku"]
-        )
-    }
+    # Accepted proxy API keys in addition to PROXY_API_KEYS
+    "proxy_api_keys": []
 }
 
-# Flattened model to provider mapping
-MODEL_TO_PROVIDER: Dict[str, tuple[ProviderType, str]] = {}
-for provider_type, providers in PROVIDER_CONFIGS.items():
-    for provider_name, config in providers.items():
-        for model in config.models:
-            MODEL_TO_PROVIDER[model] = (provider_type, provider_name)
+# Config file schema
+class ProviderSettings(BaseModel):
+    model_config = ConfigDict(defer_build=True)
 
-# Proxy settings
-PROXY_API_KEYS = os.getenv("PROXY_API_KEYS", "").split(",")
-REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "60"))
+    api_endpoint: str
+    models: List[str] = []
+    api_key: str = ""
+    api_key_env: Optional[str] = None
 
-# Generic proxy model names that map to actual provider models
-PROXY_MODELS = {
-    # Format: "proxy_name": (provider_type, provider_name, model_name)
-    "gemini-2.0-flash:proxy": (ProviderType.GEMINI, "google_aistudio", "gemini-2.0-flash"),
-    "deepseek-v3:proxy": (ProviderType.OPENAI, "deepseek", "deepseek-chat"),
-    "deepseek-r1:proxy": (ProviderType.OPENAI, "deepseek", "deepseek-reasoner")
-}
+class ProxyModelSettings(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    provider_type: ProviderType
+    provider: str
+    model: str
+    # Coalesce stream deltas, with STREAM_COALESCE_WINDOW_MS unless a window is given
+    coalesce: bool = False
+    coalesce_window_ms: Optional[int] = None
+
+class ConfigFile(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    providers: Dict[ProviderType, Dict[str, ProviderSettings]]
+    proxy_models: Dict[str, ProxyModelSettings]
+    proxy_api_keys: List[str] = []
+
+class ProxyRoute(NamedTuple):
+    """Resolved routing entry for a proxy model"""
+    provider_type: ProviderType
+    provider_name: str
+    model: str
+    provider_config: ProviderConfig
+    endpoint: str
+    coalesce: bool
+    coalesce_window_ms: Optional[int]
+
+    @property
+    def default_coalesce_window_ms(self) -> Optional[int]:
+        """Coalescing window for the model, or None when coalescing is off"""
+        if not self.coalesce:
+            return None
+        return self.coalesce_window_ms or STREAM_COALESCE_WINDOW_MS
+
+class ConfigSnapshot:
+    """
+    Provider/model config with precomputed lookups.
+
+    A snapshot is not modified once published by get_config: a reload builds
+    a new snapshot and swaps it in. Request handlers fetch the snapshot once
+    and use it for the whole request, so a reload never changes the config
+    under a live stream.
+    """
+    def __init__(self, config: ConfigFile, source: str, resolve_env: bool = True):
+        self.source = source
+
+        self.provider_configs: Dict[ProviderType, Dict[str, ProviderConfig]] = {}
+        # Providers whose API key is read from the environment
+        self.api_key_envs: Dict[Tuple[ProviderType, str], str] = {}
+        for provider_type, providers in config.providers.items():
+            self.provider_configs[provider_type] = {}
+            for name, settings in providers.items():
+                if not settings.api_key and settings.api_key_env:
+                    self.api_key_envs[(provider_type, name)] = settings.api_key_env
+                self.provider_configs[provider_type][name] = ProviderConfig(
+                    api_key=settings.api_key,
+                    api_endpoint=settings.api_endpoint.rstrip("/"),
+                    models=settings.models
+                )
+
+        # Flattened model to provider mapping
+        self.model_to_provider: Dict[str, tuple[ProviderType, str]] = {}
+        for provider_type, providers in self.provider_configs.items():
+            for provider_name, provider_config in providers.items():
+                for model in provider_config.models:
+                    self.model_to_provider[model] = (provider_type, provider_name)
+
+        self.proxy_models: Dict[str, ProxyRoute] = {}
+        for proxy_name, settings in config.proxy_models.items():
+            provider_config = self.provider_configs.get(settings.provider_type, {}).get(settings.provider)
+            if provider_config is None:
+                raise ValueError(
+                    f"Proxy model '{proxy_name}' references unknown provider "
+                    f"'{settings.provider_type.value}/{settings.provider}'"
+                )
+            self.proxy_models[proxy_name] = ProxyRoute(
+                provider_type=settings.provider_type,
+                provider_name=settings.provider,
+                model=settings.model,
+                provider_config=provider_config,
+                endpoint=f"{provider_config.api_endpoint}/chat/completions",
+                coalesce=settings.coalesce,
+                coalesce_window_ms=settings.coalesce_window_ms
+            )
+
+        self.file_api_keys: List[str] = list(config.proxy_api_keys)
+        self.api_keys: FrozenSet[str] = frozenset()
+
+        # Pre-rendered /v1/models response body
+        self.models_response: bytes = json.dumps({
+            "object": "list",
+            "data": [
+                {"id": model_id, "object": "model", "owned_by": "system"}
+                for model_id in self.proxy_models
+            ]
+        }).encode("utf-8")
+
+        if resolve_env:
+            self.resolve_env()
+
+    def resolve_env(self, env: Optional[Mapping[str, str]] = None):
+        """
+        Fill in secrets taken from the environment (`os.environ` by default).
+
+        Kept separate from construction so a reload can resolve secrets
+        against .env as it is now on disk. Providers with an environment key
+        get new ProviderConfig objects and routes rather than being changed
+        in place.
+        """
+        if env is None:
+            env = os.environ
+
+        for (provider_type, name), env_name in self.api_key_envs.items():
+            provider_config = self.provider_configs[provider_type][name]
+            api_key = env.get(env_name, "")
+            self.provider_configs[provider_type][name] = provider_config.model_copy(
+                update={"api_key": api_key, "available": bool(api_key)}
+            )
+        if self.api_key_envs:
+            self.proxy_models = {
+                proxy_name: route._replace(
+                    provider_config=self.provider_configs[route.provider_type][route.provider_name]
+                )
+                for proxy_name, route in self.proxy_models.items()
+            }
+
+        env_keys = env.get("PROXY_API_KEYS", "").split(",")
+        self.api_keys = frozenset(
+            key.strip() for key in [*env_keys, *self.file_api_keys] if key.strip()
+        )
+
+def load_snapshot(path: Union[str, Path, None] = None, resolve_env: bool = True,
+                  use_defaults: bool = True) -> ConfigSnapshot:
+    """
+    Build a config snapshot from the config file.
+
+    If the file is missing, the built-in defaults are used, or
+    FileNotFoundError is raised when `use_defaults` is false.
+    """
+    path = Path(path or CONFIG_FILE)
+    if path.is_file():
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        source = str(path)
+    elif use_defaults:
+        data = DEFAULT_CONFIG
+        source = "defaults"
+    else:
+        raise FileNotFoundError(f"Config file {path} not found")
+    return ConfigSnapshot(ConfigFile(**data), source=source, resolve_env=resolve_env)
+
+# Current snapshot, built on first use; replaced atomically by reload_config
+_snapshot: Optional[ConfigSnapshot] = None
+_reload_lock = threading.Lock()
+
+def get_config() -> ConfigSnapshot:
+    """Get the current config snapshot"""
+    snapshot = _snapshot
+    if snapshot is None:
+        snapshot = _load_initial_snapshot()
+    return snapshot
+
+def _load_initial_snapshot() -> ConfigSnapshot:
+    global _snapshot
+    with _reload_lock:
+        if _snapshot is None:
+            _snapshot = load_snapshot()
+        return _snapshot
+
+def reload_config() -> ConfigSnapshot:
+    """
+    Rebuild the config snapshot and swap it in.
+
+    Secrets are resolved against .env as it is now on disk, so API keys
+    rotated there take effect too. On failure the error is raised and the
+    current snapshot stays active. A missing config file is a failure too,
+    unless the current snapshot already uses the defaults.
+    """
+    global _snapshot
+    with _reload_lock:
+        use_defaults = _snapshot is None or _snapshot.source == "defaults"
+        snapshot = load_snapshot(resolve_env=False, use_defaults=use_defaults)
+        snapshot.resolve_env(read_env())
+        _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import signal
+
+from fastapi import FastAPI
+from app.config import CONFIG_FILE, CONFIG_WATCH_INTERVAL, reload_config
+from app import logger
+
+def _file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def try_reload_config(reason: str):
+    """Reload the config snapshot, keeping the current one if the new config is invalid"""
+    try:
+        snapshot = reload_config()
+    except Exception as e:
+        logger.error(f"Config reload ({reason}) failed, keeping current config: {str(e)}")
+        return None
+    logger.info(
+        f"Config reloaded ({reason}) from {snapshot.source}: "
+        f"{len(snapshot.proxy_models)} proxy models, {len(snapshot.api_keys)} API keys"
+    )
+    return snapshot
+
+async def watch_config_file(path: str, interval: float):
+    """Poll the config file and reload whenever its mtime changes"""
+    last_mtime = _file_mtime(path)
+    while True:
+        await asyncio.sleep(interval)
+        mtime = _file_mtime(path)
+        if mtime != last_mtime:
+            last_mtime = mtime
+            try_reload_config("file removed" if mtime is None else "file changed")
+
+def setup_config_reload(app: FastAPI):
+    """Reload the provider/model config on SIGHUP and when the config file changes"""
+    state = {"watcher": None}
+
+    @app.on_event("startup")
+    async def start_config_reload():
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGHUP"):
+            try:
+                loop.add_signal_handler(signal.SIGHUP, try_reload_config, "SIGHUP")
+            except (NotImplementedError, RuntimeError, ValueError) as e:
+                logger.warning(f"SIGHUP config reload unavailable: {str(e)}")
+
+        if CONFIG_WATCH_INTERVAL > 0:
+            state["watcher"] = asyncio.create_task(watch_config_file(CONFIG_FILE, CONFIG_WATCH_INTERVAL))
+            logger.debug(f"Watching {CONFIG_FILE} for changes every {CONFIG_WATCH_INTERVAL}s")
+
+    @app.on_event("shutdown")
+    async def stop_config_reload():
+        if state["watcher"] is not None:
+            state["watcher"].cancel()
@@ -0,0 +1,34 @@
+import os
+from typing import Dict
+from dotenv import dotenv_values, find_dotenv, load_dotenv
+
+_loaded = False
+_dotenv_path = ""
+# Variables that were set by .env rather than the process environment
+_dotenv_keys = frozenset()
+
+def load_env():
+    """Load environment variables from .env, once per process"""
+    global _loaded, _dotenv_path, _dotenv_keys
+    if not _loaded:
+        _dotenv_path = find_dotenv()
+        process_keys = set(os.environ)
+        load_dotenv(_dotenv_path)
+        _dotenv_keys = frozenset(set(os.environ) - process_keys)
+        _loaded = True
+
+def read_env() -> Dict[str, str]:
+    """
+    Get the environment with .env read again from disk.
+
+    Used on config reload so secrets edited in .env take effect without a
+    restart. As with load_env, variables set in the process environment
+    take precedence over .env.
+    """
+    load_env()
+    env = {name: value for name, value in os.environ.items() if name not in _dotenv_keys}
+    if _dotenv_path:
+        for name, value in dotenv_values(_dotenv_path).items():
+            if value is not None and name not in env:
+                env[name] = value
+    return env
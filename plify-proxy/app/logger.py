@@ -6,15 +6,15 @@ import contextvars
 import functools
 import inspect
 import json
+import threading
 
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
-from dotenv import load_dotenv
+from app.env import load_env
 
-load_dotenv()
-# Create logs directory if it doesn't exist
+load_env()
+# Logs directory, created when the first logger is set up
 log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
 
 # Context variables
 trace_id_var = contextvars.ContextVar('trace_id', default=None)
@@ -95,13 +95,15 @@ def setup_logger(name="plify_proxy", log_level=logging.INFO, enable_console=None
         "%(asctime)s | %(levelname)s | [%(trace_id)s] | %(component)s | %(message)s"
     )
     
-    # File handler with weekly rotation
+    # File handler with weekly rotation, opening the file on the first record
+    log_dir.mkdir(exist_ok=True)
     file_handler = TimedRotatingFileHandler(
         filename=log_dir / f"{name}.log",
         when="W0",  # Weekly rotation on Monday
         interval=1,
         backupCount=4,  # Keep 4 weeks of logs
-        encoding="utf-8"
+        encoding="utf-8",
+        delay=True
     )
     file_handler.setFormatter(file_formatter)
     logger.addHandler(file_handler)
@@ -114,8 +116,23 @@ def setup_logger(name="plify_proxy", log_level=logging.INFO, enable_console=None
     
     return logger
 
-# Create default application logger
-app_logger = setup_logger()
+# Default application logger, set up on first use to keep it off the import path
+_app_logger = None
+_app_logger_lock = threading.Lock()
+
+def get_app_logger():
+    """Get the default application logger, creating its handlers on first use"""
+    global _app_logger
+    if _app_logger is None:
+        with _app_logger_lock:
+            if _app_logger is None:
+                app_logger = setup_logger()
+                # Add context filter to all handlers
+                for handler in app_logger.handlers:
+                    if hasattr(handler, 'filters'):
+                        handler.addFilter(LogContextFilter())
+                _app_logger = app_logger
+    return _app_logger
 
 # Trace ID management
 def get_trace_id():
@@ -184,11 +201,6 @@ class LogContextFilter(logging.Filter):
                 
         return True
 
-# Add context filter to all handlers
-for handler in app_logger.handlers:
-    if hasattr(handler, 'filters'):
-        handler.addFilter(LogContextFilter())
-
 # Helper function to prepare logging context
 def _prepare_log_context(kwargs):
     """
@@ -218,20 +230,20 @@ def _prepare_log_context(kwargs):
 # Log levels convenience functions
 def debug(msg, *args, **kwargs):
     kwargs, _ = _prepare_log_context(kwargs)
-    app_logger.debug(msg, *args, **kwargs)
+    get_app_logger().debug(msg, *args, **kwargs)
 
 def info(msg, *args, **kwargs):
     kwargs, _ = _prepare_log_context(kwargs)
-    app_logger.info(msg, *args, **kwargs)
+    get_app_logger().info(msg, *args, **kwargs)
 
 def warning(msg, *args, **kwargs):
     kwargs, _ = _prepare_log_context(kwargs)
-    app_logger.warning(msg, *args, **kwargs)
+    get_app_logger().warning(msg, *args, **kwargs)
 
 def error(msg, *args, **kwargs):
     kwargs, _ = _prepare_log_context(kwargs)
-    app_logger.error(msg, *args, **kwargs)
+    get_app_logger().error(msg, *args, **kwargs)
 
 def critical(msg, *args, **kwargs):
     kwargs, _ = _prepare_log_context(kwargs)
-    app_logger.critical(msg, *args, **kwargs) 
\ No newline at end of file
+    get_app_logger().critical(msg, *args, **kwargs) 
\ No newline at end of file
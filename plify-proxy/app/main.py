@@ -1,6 +1,6 @@
 from fastapi import FastAPI
+import importlib
 import logging
-from dotenv import load_dotenv
 
 # Configure uvicorn and other third-party loggers to be less verbose
 logging.getLogger("uvicorn").setLevel(logging.WARNING)
@@ -10,12 +10,11 @@ logging.getLogger("uvicorn.error").setLevel(logging.ERROR)
 from app.middleware import setup_middleware
 from app.exception_handlers import setup_exception_handlers
 from app.setup import setup_cors
+from app.config_watcher import setup_config_reload
 from app.api import setup_routers
+from app.config import get_config
 from app import logger
 
-# Load environment variables
-load_dotenv()
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Reddit Insight LLM Proxy",
@@ -27,6 +26,7 @@ app = FastAPI(
 setup_middleware(app)
 setup_cors(app)
 setup_exception_handlers(app)
+setup_config_reload(app)
 
 # Include our API router in the main app
 app.include_router(setup_routers())
@@ -35,6 +35,9 @@ app.include_router(setup_routers())
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application starting up")
+    # Fail fast on an invalid config and keep the httpx import off the first request
+    get_config()
+    importlib.import_module("httpx")
 
 # Log application shutdown
 @app.on_event("shutdown")
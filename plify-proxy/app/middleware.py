@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request as FastAPIRequest
 from starlette.middleware.base import BaseHTTPMiddleware
-from app import logger
+from app import logger, timing
 import inspect
 
 class TraceMiddleware(BaseHTTPMiddleware):
@@ -8,6 +8,11 @@ class TraceMiddleware(BaseHTTPMiddleware):
         # Get trace ID from header or generate a new one
         trace_id = request.headers.get("X-Trace-ID")
         trace_id = logger.set_trace_id(trace_id)
+        timings = timing.start_request(
+            trace_id,
+            name=f"{request.method} {request.url.path}",
+            **{"http.method": request.method, "http.target": request.url.path}
+        )
         
         # Set request context with method and client info (but not URI)
         logger.set_request_context(
@@ -35,6 +40,12 @@ class TraceMiddleware(BaseHTTPMiddleware):
         
         # Add trace ID to response headers
         response.headers["X-Trace-ID"] = trace_id
+
+        # Streaming responses report their own timings once the stream ends
+        if not timings.streaming:
+            timings.finish(**{"http.status_code": response.status_code})
+            response.headers["Server-Timing"] = timings.server_timing()
+            timing.export(timings)
         return response
 
 def setup_middleware(app: FastAPI):
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import Any, Dict, List, Optional
-import httpx
 import json
 from pydantic import BaseModel, Field
 
-from app.config import PROXY_MODELS, PROVIDER_CONFIGS
-from app import logger
+from app.config import (
+    get_config, STREAM_COALESCE_WINDOW_MS, STREAM_COALESCE_MAX_BYTES, STREAM_COALESCE_MAX_WINDOW_MS
+)
+from app.coalesce import coalesce_deltas
+from app import logger, timing
 
 # Initialize router
 router = APIRouter(tags=["OpenAI Compatible API"])
@@ -34,22 +36,15 @@ async def list_models(request: Request):
     trace_id = logger.get_trace_id()
 
     try:
-        # Only return proxy models from config
-        proxy_models = [
-            {"id": model_id, "object": "model", "owned_by": "system"}
-            for model_id in PROXY_MODELS.keys()
-        ]
+        # Only return proxy models from config, pre-rendered with the snapshot
+        config = get_config()
         
         # Detailed log about the operation without repeating URI
-        logger.debug(f"Returning {len(proxy_models)} proxy models")
+        logger.debug(f"Returning {len(config.proxy_models)} proxy models")
         
-        response_data = {
-            "object": "list",
-            "data": proxy_models
-        }
-        
-        return JSONResponse(
-            content=response_data,
+        return Response(
+            content=config.models_response,
+            media_type="application/json",
             headers={"X-Trace-ID": trace_id}
         )
     except Exception as e:
@@ -73,39 +68,149 @@ def map_real_model_to_proxy_model(response_data: dict, proxy_model: str):
                     
     return response_data
 
+def resolve_coalesce_window(default: Optional[int], header_value: Optional[str]) -> Optional[int]:
+    """
+    Resolve the stream coalescing window in milliseconds, or None when disabled.
+
+    The `X-Stream-Coalesce` request header overrides the proxy model default:
+    "off"/"0" disables coalescing, "on" enables it with the default window and
+    a positive integer sets the window in milliseconds. Windows are capped at
+    STREAM_COALESCE_MAX_WINDOW_MS so a client cannot hold tokens back for long.
+    """
+    if header_value is None:
+        window_ms = default
+    else:
+        value = header_value.strip().lower()
+        if value in ("off", "false", "0"):
+            return None
+        if value in ("on", "true"):
+            window_ms = default or STREAM_COALESCE_WINDOW_MS
+        else:
+            try:
+                window_ms = int(value)
+            except ValueError:
+                logger.warning(f"Ignoring invalid X-Stream-Coalesce value: {header_value[:20]}")
+                window_ms = default
+
+    if not window_ms or window_ms <= 0:
+        return None
+    return min(window_ms, STREAM_COALESCE_MAX_WINDOW_MS)
+
+def upstream_client():
+    """Create a client for provider requests, importing httpx on first use."""
+    import httpx
+    return httpx.AsyncClient()
+
+def resolve_proxy_route(proxy_model: str):
+    """Resolve a proxy model to its routing entry, raising if it cannot be served."""
+    route = get_config().proxy_models.get(proxy_model)
+    if route is None:
+        logger.error(f"Unsupported model: {proxy_model}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported model: {proxy_model}"
+        )
+    
+    if not route.provider_config.available:
+        logger.error(f"Provider {route.provider_name} is not available")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Provider {route.provider_name} is not available"
+        )
+    return route
+
+def build_upstream_headers(route, trace_id: str) -> Dict[str, str]:
+    """Build the headers for a request forwarded to the route's provider."""
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {route.provider_config.api_key}",
+        "X-Trace-ID": trace_id  # Forward trace ID to downstream services
+    }
+
+def upstream_error_message(response) -> str:
+    """Extract the error message from a provider error response."""
+    try:
+        data = response.json()
+    except ValueError:
+        return response.text[:500] or f"Provider returned {response.status_code}"
+    error = data.get("error") if isinstance(data, dict) else None
+    if isinstance(error, dict) and error.get("message"):
+        return str(error["message"])
+    if isinstance(error, str):
+        return error
+    return json.dumps(data)[:500]
+
+async def stream_upstream_events(endpoint, headers, request_data, proxy_model, extensions=None):
+    """
+    Stream a chat completion from the provider.
+    
+    Yields parsed JSON chunks as dicts, with the model mapped back to the
+    proxy model, and any other SSE line as a string. Raises HTTPException
+    with the provider's status when it rejects the request.
+    """
+    # Use direct connection to prevent buffering
+    async with upstream_client() as client:
+        async with client.stream(
+            "POST",
+            endpoint,
+            headers=headers,
+            json=request_data.dict(exclude_none=True),
+            timeout=None,
+            extensions=extensions
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                detail = upstream_error_message(response)
+                logger.error(f"Provider returned {response.status_code}: {detail}")
+                raise HTTPException(status_code=response.status_code, detail=detail)
+            
+            # Process each line as it's received
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    # Pass empty lines for proper SSE formatting
+                    yield "\n"
+                    continue
+                
+                if line.startswith("data: "):
+                    data_str = line[6:].strip()
+                    if data_str == "[DONE]":
+                        logger.debug(f"Stream complete, sending [DONE]")
+                        yield "data: [DONE]\n\n"
+                    else:
+                        try:
+                            data = json.loads(data_str)
+                            if 'model' in data:
+                                data['model'] = proxy_model
+                            yield data
+                        except json.JSONDecodeError:
+                            # Pass through unchanged if not valid JSON
+                            logger.warning(f"Received non-JSON data in stream: {data_str[:20]}...")
+                            yield f"{line}\n"
+                else:
+                    # Pass through other lines unchanged
+                    yield f"{line}\n"
+
 @router.post("/chat/completions")
 @logger.with_trace_id
 async def create_chat_completion(request: Request):
     """Create a chat completion by forwarding to the appropriate provider."""
     trace_id = logger.get_trace_id()
+    timings = timing.current()
     # We don't need to set request context with URI here as middleware already did it
     
     try:
         # Parse request body
-        body = await request.json()
-        request_data = ChatCompletionRequest(**body)
+        with timing.span("parse"):
+            body = await request.json()
+            request_data = ChatCompletionRequest(**body)
         
         # Get model from request
         proxy_model = request_data.model
         
-        # Check if the model is in our proxy models
-        if proxy_model not in PROXY_MODELS:
-            logger.error(f"Unsupported model: {proxy_model}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported model: {proxy_model}"
-            )
-        
-        # Get provider details from config
-        provider_type, provider_name, real_model = PROXY_MODELS[proxy_model]
-        provider_config = PROVIDER_CONFIGS[provider_type][provider_name]
-        
-        if not provider_config.available:
-            logger.error(f"Provider {provider_name} is not available")
-            raise HTTPException(
-                status_code=503,
-                detail=f"Provider {provider_name} is not available"
-            )
+        # Check if the model is in our proxy models and its provider is available
+        route = resolve_proxy_route(proxy_model)
+        provider_name = route.provider_name
+        real_model = route.model
         
         # Replace proxy model with real model
         request_data.model = real_model
@@ -113,14 +218,13 @@ async def create_chat_completion(request: Request):
         logger.info(f"Forwarding request to '{provider_name}' with model '{real_model}'")
         
         # Prepare request for forwarding
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {provider_config.api_key}",
-            "X-Trace-ID": trace_id  # Forward trace ID to downstream services
-        }
+        headers = build_upstream_headers(route, trace_id)
+        
+        # Time upstream connect and first byte through the httpcore trace hook
+        extensions = {"trace": timings.upstream_trace} if timings else None
         
         # Forward request to provider
-        endpoint = f"{provider_config.api_endpoint}/chat/completions"
+        endpoint = route.endpoint
         
         # Handle streaming requests
         if request_data.stream:
@@ -130,23 +234,31 @@ async def create_chat_completion(request: Request):
                 headers=headers,
                 request_data=request_data,
                 proxy_model=proxy_model,
-                trace_id=trace_id
+                trace_id=trace_id,
+                timings=timings,
+                extensions=extensions,
+                coalesce_window_ms=resolve_coalesce_window(
+                    route.default_coalesce_window_ms, request.headers.get("X-Stream-Coalesce")
+                )
             )
         else:
             # Handle regular non-streaming requests
             logger.debug(f"Handling regular request for model '{real_model}'")
-            async with httpx.AsyncClient() as client:
+            async with upstream_client() as client:
                 response = await client.post(
                     endpoint,
                     headers=headers,
                     json=request_data.dict(exclude_none=True),
-                    timeout=60
+                    timeout=60,
+                    extensions=extensions
                 )
                 
                 # Regular response - map model name back
                 response_data = response.json()
                 response_data = map_real_model_to_proxy_model(response_data, proxy_model)
                 logger.debug(f"Received response from '{provider_name}' for model '{real_model}'")
+                if timings:
+                    timings.mark("client_ttfb")
                 return JSONResponse(content=response_data)
             
     except Exception as e:
@@ -156,44 +268,46 @@ async def create_chat_completion(request: Request):
             detail=f"Failed to create chat completion: {str(e)}"
         )
 
-async def handle_streaming_request(endpoint, headers, request_data, proxy_model, trace_id):
+async def handle_streaming_request(endpoint, headers, request_data, proxy_model, trace_id,
+                                   timings=None, extensions=None, coalesce_window_ms=None):
     """Handle streaming requests with proper model name mapping."""
+    if timings:
+        timings.streaming = True
+    
+    async def sse_frames():
+        events = stream_upstream_events(endpoint, headers, request_data, proxy_model, extensions)
+        if coalesce_window_ms:
+            logger.debug(f"Coalescing stream deltas with a {coalesce_window_ms}ms window")
+            events = coalesce_deltas(events, coalesce_window_ms, STREAM_COALESCE_MAX_BYTES)
+        try:
+            async for event in events:
+                yield event if isinstance(event, str) else f"data: {json.dumps(event)}\n\n"
+        except HTTPException as e:
+            # Headers are already sent, so report provider errors in the stream
+            # the way OpenAI-compatible clients expect them
+            error = {"error": {"message": str(e.detail), "code": str(e.status_code)}}
+            yield f"data: {json.dumps(error)}\n\n"
     
     async def stream_generator():
-        # Use direct connection to prevent buffering
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                endpoint,
-                headers=headers,
-                json=request_data.dict(exclude_none=True),
-                timeout=None
-            ) as response:
-                # Process each line as it's received
-                async for line in response.aiter_lines():
-                    if not line.strip():
-                        # Pass empty lines for proper SSE formatting
-                        yield "\n"
-                        continue
-                    
-                    if line.startswith("data: "):
-                        data_str = line[6:].strip()
-                        if data_str == "[DONE]":
-                            logger.debug(f"Stream complete, sending [DONE]")
-                            yield "data: [DONE]\n\n"
-                        else:
-                            try:
-                                data = json.loads(data_str)
-                                if 'model' in data:
-                                    data['model'] = proxy_model
-                                yield f"data: {json.dumps(data)}\n\n"
-                            except json.JSONDecodeError:
-                                # Pass through unchanged if not valid JSON
-                                logger.warning(f"Received non-JSON data in stream: {data_str[:20]}...")
-                                yield f"{line}\n"
-                    else:
-                        # Pass through other lines unchanged
-                        yield f"{line}\n"
+        if not timings:
+            async for chunk in sse_frames():
+                yield chunk
+            return
+        
+        try:
+            async for chunk in sse_frames():
+                if "client_ttfb" not in timings.spans:
+                    timings.mark("client_ttfb")
+                    timings.start("stream")
+                yield chunk
+            timings.end("stream")
+            timings.finish(**{"http.status_code": 200})
+            # Report phase timings as a trailing SSE comment
+            yield f": server-timing {timings.server_timing()}\n\n"
+        finally:
+            timings.end("stream")
+            timings.finish()
+            timing.export(timings)
     
     return StreamingResponse(
         content=stream_generator(),
@@ -0,0 +1,273 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from contextlib import aclosing
+from typing import Any, Dict, Optional
+from pydantic import ValidationError
+import asyncio
+import json
+
+from app.config import (
+    get_config, STREAM_COALESCE_MAX_BYTES,
+    WS_MAX_STREAMS, WS_STREAM_WINDOW, WS_MAX_STREAM_WINDOW, WS_AUTH_TIMEOUT
+)
+from app.coalesce import coalesce_deltas
+from app.routers.openai import (
+    ChatCompletionRequest, resolve_proxy_route, build_upstream_headers,
+    stream_upstream_events, resolve_coalesce_window
+)
+from app import logger, timing
+
+# Initialize router
+router = APIRouter(tags=["OpenAI Compatible API"])
+
+# WebSocket close code for policy violations such as failed authentication
+POLICY_VIOLATION = 1008
+
+async def receive_text(websocket: WebSocket) -> Optional[str]:
+    """
+    Receive the next message, returning None for a binary message.
+
+    Unlike WebSocket.receive_text this does not fail on binary frames,
+    which are valid WebSocket input.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    return message.get("text")
+
+class StreamCredit:
+    """
+    Flow control credit of one stream.
+
+    Credit is a counter capped at `limit`, so a grant costs O(1) however
+    much the client asks for.
+    """
+    def __init__(self, initial: int, limit: int):
+        self.limit = limit
+        self.available = max(min(initial, limit), 1)
+        self.granted = asyncio.Event()
+
+    def grant(self, amount: int):
+        if amount <= 0:
+            return
+        self.available = min(self.available + amount, self.limit)
+        self.granted.set()
+
+    async def acquire(self):
+        while self.available <= 0:
+            self.granted.clear()
+            await self.granted.wait()
+        self.available -= 1
+
+class StreamMultiplexer:
+    """
+    Runs several chat completion streams over one WebSocket connection.
+
+    Client messages:
+        {"type": "request", "id": "s1", "body": {...}, "coalesce": "on", "window": 64}
+        {"type": "credit", "id": "s1", "credit": 32}
+        {"type": "cancel", "id": "s1"}
+        {"type": "ping"}
+
+    Server messages:
+        {"type": "ready", "max_streams": 8, "window": 64}
+        {"type": "chunk", "id": "s1", "data": {...}}
+        {"type": "done", "id": "s1", "server_timing": "..."}
+        {"type": "cancelled", "id": "s1"}
+        {"type": "error", "id": "s1", "code": "...", "message": "..."}
+        {"type": "pong"}
+
+    Each stream may have at most `window` chunk messages in flight; the
+    client grants more with `credit` messages. Both are capped at
+    WS_MAX_STREAM_WINDOW. A stream that runs out of credit stops reading
+    from its provider until more is granted.
+    """
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.streams: Dict[str, asyncio.Task] = {}
+        self.credits: Dict[str, StreamCredit] = {}
+        self.send_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        async with self.send_lock:
+            await self.websocket.send_text(json.dumps(message))
+
+    async def send_error(self, stream_id: Optional[str], code: str, message: str):
+        await self.send({"type": "error", "id": stream_id, "code": code, "message": message})
+
+    async def run(self):
+        """Dispatch client messages until the connection closes"""
+        try:
+            while True:
+                raw = await receive_text(self.websocket)
+                if raw is None:
+                    await self.send_error(None, "invalid_message", "Binary messages are not supported")
+                    continue
+                try:
+                    message = json.loads(raw)
+                except json.JSONDecodeError:
+                    await self.send_error(None, "invalid_message", "Message is not valid JSON")
+                    continue
+                if not isinstance(message, dict):
+                    await self.send_error(None, "invalid_message", "Message must be a JSON object")
+                    continue
+                try:
+                    await self.dispatch(message)
+                except (TypeError, ValueError, OverflowError) as e:
+                    await self.send_error(message.get("id"), "invalid_message", str(e))
+        except WebSocketDisconnect:
+            logger.info(f"WebSocket disconnected with {len(self.streams)} active streams")
+        finally:
+            # Wait for cancelled streams to close their upstream requests
+            tasks = list(self.streams.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def dispatch(self, message: Dict[str, Any]):
+        message_type = message.get("type")
+        stream_id = message.get("id")
+
+        if message_type == "ping":
+            await self.send({"type": "pong"})
+        elif message_type == "request":
+            await self.start_stream(stream_id, message)
+        elif message_type == "credit":
+            credit = self.credits.get(stream_id)
+            if credit is None:
+                return
+            credit.grant(int(message.get("credit", 0)))
+        elif message_type == "cancel":
+            task = self.streams.get(stream_id)
+            if task is None:
+                return
+            logger.info(f"Cancelling stream {stream_id}")
+            task.cancel()
+        else:
+            await self.send_error(stream_id, "invalid_message", f"Unknown message type: {message_type}")
+
+    async def start_stream(self, stream_id, message: Dict[str, Any]):
+        if not isinstance(stream_id, str) or not stream_id:
+            await self.send_error(None, "invalid_message", "Request message requires a string id")
+            return
+        if stream_id in self.streams:
+            await self.send_error(stream_id, "duplicate_stream", f"Stream {stream_id} is already active")
+            return
+        if len(self.streams) >= WS_MAX_STREAMS:
+            await self.send_error(stream_id, "too_many_streams", f"At most {WS_MAX_STREAMS} concurrent streams")
+            return
+
+        window = int(message.get("window", WS_STREAM_WINDOW))
+        self.credits[stream_id] = StreamCredit(window, WS_MAX_STREAM_WINDOW)
+        coalesce = message.get("coalesce")
+        self.streams[stream_id] = asyncio.create_task(
+            self.run_stream(stream_id, message.get("body") or {}, None if coalesce is None else str(coalesce))
+        )
+
+    async def run_stream(self, stream_id: str, body: Dict[str, Any], coalesce: Optional[str]):
+        """Forward one chat completion and relay its chunks tagged with the stream ID"""
+        trace_id = logger.set_trace_id()
+        logger.set_request_context(stream_id=stream_id)
+        timings = timing.start_request(trace_id, name="WS chat.completions", **{"ws.stream_id": stream_id})
+        timings.streaming = True
+        credit = self.credits[stream_id]
+
+        try:
+            with timings.span("parse"):
+                request_data = ChatCompletionRequest(**body)
+
+            proxy_model = request_data.model
+            route = resolve_proxy_route(proxy_model)
+            request_data.model = route.model
+            request_data.stream = True
+
+            logger.info(f"Forwarding stream {stream_id} to '{route.provider_name}' with model '{route.model}'")
+
+            events = stream_upstream_events(
+                route.endpoint,
+                build_upstream_headers(route, trace_id),
+                request_data,
+                proxy_model,
+                {"trace": timings.upstream_trace}
+            )
+            coalesce_window_ms = resolve_coalesce_window(route.default_coalesce_window_ms, coalesce)
+            if coalesce_window_ms:
+                events = coalesce_deltas(events, coalesce_window_ms, STREAM_COALESCE_MAX_BYTES)
+
+            async with aclosing(events):
+                async for event in events:
+                    # Only JSON chunks are relayed; [DONE] becomes the done message
+                    if not isinstance(event, dict):
+                        continue
+                    if "error" in event:
+                        # Error reported by the provider inside the stream
+                        error = event["error"]
+                        message = error.get("message") if isinstance(error, dict) else None
+                        raise HTTPException(status_code=502, detail=message or json.dumps(error))
+                    await credit.acquire()
+                    if "client_ttfb" not in timings.spans:
+                        timings.mark("client_ttfb")
+                        timings.start("stream")
+                    await self.send({"type": "chunk", "id": stream_id, "data": event})
+
+            timings.end("stream")
+            timings.finish(**{"ws.status": "done"})
+            await self.send({"type": "done", "id": stream_id, "server_timing": timings.server_timing()})
+        except asyncio.CancelledError:
+            timings.finish(**{"ws.status": "cancelled"})
+            try:
+                await self.send({"type": "cancelled", "id": stream_id})
+            except Exception:
+                # The connection itself is gone
+                pass
+        except ValidationError as e:
+            logger.error(f"Invalid request on stream {stream_id}: {str(e)}")
+            await self.send_error(stream_id, "validation_error", str(e))
+        except HTTPException as e:
+            await self.send_error(stream_id, str(e.status_code), str(e.detail))
+        except Exception as e:
+            logger.error(f"Error on stream {stream_id}: {str(e)}", exc_info=True)
+            try:
+                await self.send_error(stream_id, "internal_error", f"Failed to create chat completion: {str(e)}")
+            except Exception:
+                pass
+        finally:
+            timings.end("stream")
+            timings.finish()
+            timing.export(timings)
+            self.streams.pop(stream_id, None)
+            self.credits.pop(stream_id, None)
+
+async def authenticate(websocket: WebSocket) -> bool:
+    """
+    Authenticate with the X-API-KEY header or, for browsers that cannot set
+    headers on WebSockets, a first {"type": "auth", "api_key": "..."} message.
+    """
+    api_key = websocket.headers.get("X-API-KEY")
+    if api_key is None:
+        try:
+            message = json.loads(await asyncio.wait_for(receive_text(websocket), WS_AUTH_TIMEOUT) or "null")
+        except (asyncio.TimeoutError, json.JSONDecodeError, WebSocketDisconnect):
+            return False
+        if isinstance(message, dict) and message.get("type") == "auth":
+            api_key = message.get("api_key")
+
+    if not isinstance(api_key, str) or api_key not in get_config().api_keys:
+        logger.warning(f"Invalid WebSocket API key attempt: {str(api_key)[:5]}...")
+        return False
+    return True
+
+@router.websocket("/ws")
+async def chat_completion_stream_socket(websocket: WebSocket):
+    """Multiplex chat completion streams over one authenticated WebSocket."""
+    logger.set_trace_id()
+    logger.set_request_context(path=websocket.url.path, client=websocket.client.host if websocket.client else "-")
+    await websocket.accept()
+
+    if not await authenticate(websocket):
+        await websocket.close(code=POLICY_VIOLATION, reason="Invalid or missing API key")
+        return
+
+    logger.info("WebSocket connection authenticated")
+    multiplexer = StreamMultiplexer(websocket)
+    await multiplexer.send({"type": "ready", "max_streams": WS_MAX_STREAMS, "window": WS_STREAM_WINDOW})
+    await multiplexer.run()
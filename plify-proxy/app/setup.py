@@ -8,7 +8,10 @@ def setup_cors(app: FastAPI):
     origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
     origins.append("http://localhost:8000")  # Add FastAPI docs origin
 
-    logger.info(f"Configuring CORS with origins: {origins}")
+    # Logged at startup so importing the app does not set up log handlers
+    @app.on_event("startup")
+    async def log_cors_origins():
+        logger.info(f"Configuring CORS with origins: {origins}")
 
     app.add_middleware(
         CORSMiddleware,
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import queue
+import atexit
+import hashlib
+import threading
+import contextvars
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.config import TIMING_EXPORT_FILE
+from app import logger
+
+# Context variable holding the timings of the request being served
+timings_var = contextvars.ContextVar('request_timings', default=None)
+
+# Finished request timings waiting to be written by the export thread; when
+# the thread falls behind, further spans are dropped instead of queued
+_export_queue = queue.Queue(maxsize=1024)
+_export_thread = None
+_export_thread_lock = threading.Lock()
+# Set when the export file cannot be opened
+_export_disabled = False
+
+class RequestTimings:
+    """
+    Lightweight per-request phase spans.
+
+    Spans are measured with a monotonic clock relative to the start of the
+    request and are rendered either as a `Server-Timing` header value or as
+    OTLP-compatible JSON for export.
+    """
+    def __init__(self, trace_id, name="request", attributes=None):
+        self.trace_id = trace_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_unix_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.spans = {}  # name -> [start_ns, end_ns]
+        self.streaming = False
+
+    def start(self, name):
+        """Open (or restart) the span with the given name"""
+        self.spans[name] = [time.perf_counter_ns(), None]
+
+    def end(self, name):
+        """Close the span with the given name if it is open"""
+        span = self.spans.get(name)
+        if span is not None and span[1] is None:
+            span[1] = time.perf_counter_ns()
+
+    def mark(self, name):
+        """Record a span from the start of the request until now"""
+        if name not in self.spans:
+            self.spans[name] = [self.start_ns, time.perf_counter_ns()]
+
+    @contextmanager
+    def span(self, name):
+        self.start(name)
+        try:
+            yield self
+        finally:
+            self.end(name)
+
+    def finish(self, **attributes):
+        """Mark the request as complete and attach final attributes"""
+        if self.end_ns is None:
+            self.end_ns = time.perf_counter_ns()
+        self.attributes.update(attributes)
+
+    async def upstream_trace(self, event_name, info):
+        """httpcore `trace` extension hook timing upstream connect and first byte"""
+        if event_name == "connection.connect_tcp.started":
+            self.start("upstream_connect")
+        elif event_name == "connection.connect_tcp.complete":
+            self.end("upstream_connect")
+        elif event_name == "connection.start_tls.started":
+            self.start("upstream_tls")
+        elif event_name == "connection.start_tls.complete":
+            self.end("upstream_tls")
+        elif event_name.endswith(".send_request_headers.started"):
+            self.start("upstream_ttfb")
+        elif event_name.endswith(".receive_response_headers.complete"):
+            self.end("upstream_ttfb")
+
+    def server_timing(self):
+        """Render completed spans as a Server-Timing header value"""
+        entries = [
+            f"{name};dur={(end - start) / 1e6:.3f}"
+            for name, (start, end) in self.spans.items()
+            if end is not None
+        ]
+        if self.end_ns is not None:
+            entries.append(f"total;dur={(self.end_ns - self.start_ns) / 1e6:.3f}")
+        return ", ".join(entries)
+
+    def to_otlp(self):
+        """Render the request and its spans as an OTLP/JSON ExportTraceServiceRequest"""
+        trace_id = _otlp_trace_id(self.trace_id)
+        root_span_id = os.urandom(8).hex()
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+
+        def unix_ns(perf_ns):
+            return str(self.start_unix_ns + (perf_ns - self.start_ns))
+
+        spans = [{
+            "traceId": trace_id,
+            "spanId": root_span_id,
+            "name": self.name,
+            "kind": 2,  # SPAN_KIND_SERVER
+            "startTimeUnixNano": unix_ns(self.start_ns),
+            "endTimeUnixNano": unix_ns(end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+        }]
+        for name, (start, end) in self.spans.items():
+            if end is None:
+                continue
+            spans.append({
+                "traceId": trace_id,
+                "spanId": os.urandom(8).hex(),
+                "parentSpanId": root_span_id,
+                "name": name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": unix_ns(start),
+                "endTimeUnixNano": unix_ns(end),
+            })
+
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": _otlp_attributes({"service.name": "plify-proxy"})
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "plify_proxy.timing"},
+                    "spans": spans
+                }]
+            }]
+        }
+
+def _otlp_trace_id(trace_id):
+    """Convert an X-Trace-ID value into a 32 hex character OTLP trace ID"""
+    candidate = (trace_id or "").replace("-", "").lower()
+    if len(candidate) == 32 and all(c in "0123456789abcdef" for c in candidate):
+        return candidate
+    return hashlib.md5((trace_id or "").encode("utf-8")).hexdigest()
+
+def _otlp_attributes(attributes):
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        result.append({"key": key, "value": typed})
+    return result
+
+# Request timings management
+def start_request(trace_id, name="request", **attributes):
+    """Create timings for the current request and bind them to the context"""
+    timings = RequestTimings(trace_id, name=name, attributes=attributes)
+    timings_var.set(timings)
+    return timings
+
+def current():
+    """Get the timings of the current request or None if not set"""
+    return timings_var.get()
+
+@contextmanager
+def span(name):
+    """Time a phase of the current request; a no-op outside of a request"""
+    timings = current()
+    if timings is None:
+        yield None
+        return
+    with timings.span(name):
+        yield timings
+
+def export(timings):
+    """
+    Queue the request spans for export as one OTLP JSON line.
+
+    Serialization and file I/O happen on a background thread so the event
+    loop never blocks on disk.
+    """
+    if not TIMING_EXPORT_FILE or timings is None or _export_disabled:
+        return
+    try:
+        _export_queue.put_nowait(timings)
+    except queue.Full:
+        pass
+    # Started after queueing so a worker that fails to open the file drains this span too
+    _start_export_thread()
+
+def _start_export_thread():
+    global _export_thread
+    if _export_thread is not None:
+        return
+    with _export_thread_lock:
+        if _export_thread is None:
+            _export_thread = threading.Thread(target=_export_worker, name="timing-export", daemon=True)
+            _export_thread.start()
+            atexit.register(_stop_export_thread)
+
+def _stop_export_thread():
+    """Flush queued spans before the interpreter exits"""
+    if _export_thread is None or not _export_thread.is_alive():
+        return
+    try:
+        _export_queue.put(None, timeout=5)
+    except queue.Full:
+        return
+    _export_thread.join(timeout=5)
+
+def _export_worker():
+    global _export_disabled
+    path = Path(TIMING_EXPORT_FILE)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, "a", encoding="utf-8")
+    except OSError as e:
+        _export_disabled = True
+        logger.error(f"Cannot open span export file, span export disabled: {str(e)}")
+        # Release spans queued before export was disabled
+        while not _export_queue.empty():
+            _export_queue.get_nowait()
+        return
+
+    with f:
+        while True:
+            timings = _export_queue.get()
+            if timings is None:
+                return
+            try:
+                f.write(json.dumps(timings.to_otlp(), separators=(",", ":")) + "\n")
+            except Exception:
+                # Never let one bad record stop the exporter
+                continue
+            # Flush once the backlog is drained rather than per line
+            if _export_queue.empty():
+                f.flush()
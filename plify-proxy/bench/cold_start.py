@@ -0,0 +1,85 @@
+"""
+Cold start benchmark for the proxy.
+
+Measures:
+- import time of `app.main` in a fresh interpreter
+- time from spawning uvicorn to the first successful authenticated request
+
+Usage (from the plify-proxy directory):
+    python bench/cold_start.py [--runs 5]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+API_KEY = "bench-key"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_import(env, cwd):
+    code = (
+        "import time; t = time.perf_counter(); import app.main; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=cwd,
+        capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+def measure_first_request(env, cwd, timeout=30):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/oai/v1/models"
+    request = urllib.request.Request(url, headers={"X-API-KEY": API_KEY})
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(request, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("Server did not answer before the timeout")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(ROOT),
+            PROXY_API_KEYS=API_KEY,
+            TIMING_EXPORT_FILE="",
+            CONFIG_WATCH_INTERVAL="0"
+        )
+        imports = [measure_import(env, cwd) for _ in range(args.runs)]
+        first_requests = [measure_first_request(env, cwd) for _ in range(args.runs)]
+        print(
+            f"import: median {statistics.median(imports):7.1f}ms  min {min(imports):7.1f}ms | "
+            f"first request: median {statistics.median(first_requests):7.1f}ms  min {min(first_requests):7.1f}ms"
+        )
+
+if __name__ == "__main__":
+    main()
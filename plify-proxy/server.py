@@ -1,11 +1,11 @@
 import os
 import logging
 import uvicorn
-from dotenv import load_dotenv
+from app.env import load_env
 from app import logger
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Configure uvicorn logging
 logging.getLogger("uvicorn").setLevel(logging.WARNING)
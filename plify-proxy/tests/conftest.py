@@ -0,0 +1,48 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from app.routers import openai
+
+API_KEY = "test-key"
+PROXY_MODEL = "test-model:proxy"
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test in an empty directory so no config.json or logs leak in or out"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    """Install a config snapshot with one proxy model and the test API key"""
+    snapshot = config.ConfigSnapshot(
+        config.ConfigFile(
+            providers={"openai": {"upstream": {
+                "api_key": "provider-key", "api_endpoint": "http://upstream/v1", "models": ["real-model"]
+            }}},
+            proxy_models={PROXY_MODEL: {"provider_type": "openai", "provider": "upstream", "model": "real-model"}},
+            proxy_api_keys=[API_KEY]
+        ),
+        source="test",
+        resolve_env=False
+    )
+    snapshot.resolve_env({})
+    monkeypatch.setattr(config, "_snapshot", snapshot)
+    return snapshot
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Send provider requests to a handler given by the test"""
+    def install(handler):
+        monkeypatch.setattr(
+            openai, "upstream_client",
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+    return install
+
+@pytest.fixture
+def client(snapshot):
+    from app.main import app
+    return TestClient(app)
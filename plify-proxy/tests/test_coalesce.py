@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+from app.coalesce import DeltaCoalescer, coalesce_deltas
+
+# Frames as sent by Gemini's OpenAI-compatible endpoint: every chunk repeats
+# the role and the last text fragment arrives together with finish_reason
+GEMINI_FRAMES = [
+    '{"choices":[{"delta":{"content":"The","role":"assistant"},"index":0}],"created":1745486020,"model":"gemini-2.0-flash","object":"chat.completion.chunk"}',
+    '{"choices":[{"delta":{"content":" quick brown","role":"assistant"},"index":0}],"created":1745486020,"model":"gemini-2.0-flash","object":"chat.completion.chunk"}',
+    '{"choices":[{"delta":{"content":" fox jumps","role":"assistant"},"index":0}],"created":1745486020,"model":"gemini-2.0-flash","object":"chat.completion.chunk"}',
+    '{"choices":[{"delta":{"content":" over the","role":"assistant"},"index":0}],"created":1745486020,"model":"gemini-2.0-flash","object":"chat.completion.chunk"}',
+    '{"choices":[{"delta":{"content":" lazy dog.","role":"assistant"},"finish_reason":"stop","index":0}],"created":1745486020,"model":"gemini-2.0-flash","object":"chat.completion.chunk"}',
+]
+
+def gemini_events():
+    events = []
+    for frame in GEMINI_FRAMES:
+        events.append(json.loads(frame))
+        events.append("\n")
+    events.append("data: [DONE]\n\n")
+    return events
+
+def contents(events):
+    return [
+        event["choices"][0]["delta"].get("content")
+        for event in events if isinstance(event, dict)
+    ]
+
+def test_gemini_deltas_with_repeated_role_are_merged():
+    coalescer = DeltaCoalescer(max_bytes=1024)
+    ready = []
+    for event in gemini_events():
+        ready += coalescer.add(event)
+    ready += coalescer.flush()
+
+    assert contents(ready) == ["The", " quick brown fox jumps over the", " lazy dog."]
+    merged = ready[1]
+    assert merged["choices"][0]["delta"]["role"] == "assistant"
+    assert ready[-1] == "data: [DONE]\n\n"
+
+def test_first_token_waits_for_non_empty_content():
+    coalescer = DeltaCoalescer(max_bytes=1024)
+    role_only = {"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}]}
+    first = {"choices": [{"index": 0, "delta": {"content": "Hel"}}]}
+
+    assert coalescer.add(role_only) == [role_only]
+    assert coalescer.add(first) == [first]
+
+def test_deltas_with_different_role_are_not_merged():
+    coalescer = DeltaCoalescer(max_bytes=1024)
+    coalescer.add({"choices": [{"index": 0, "delta": {"content": "a", "role": "assistant"}}]})
+    coalescer.add({"choices": [{"index": 0, "delta": {"content": "b", "role": "assistant"}}]})
+    ready = coalescer.add({"choices": [{"index": 0, "delta": {"content": "c", "role": "tool"}}]})
+    ready += coalescer.flush()
+
+    assert contents(ready) == ["b", "c"]
+
+def test_byte_threshold_flushes():
+    coalescer = DeltaCoalescer(max_bytes=4)
+    coalescer.add({"choices": [{"index": 0, "delta": {"content": "x"}}]})
+    assert coalescer.add({"choices": [{"index": 0, "delta": {"content": "ab"}}]}) == []
+    ready = coalescer.add({"choices": [{"index": 0, "delta": {"content": "cd"}}]})
+
+    assert contents(ready) == ["abcd"]
+
+def test_coalesce_deltas_flushes_on_window_while_upstream_is_idle():
+    async def upstream():
+        events = gemini_events()
+        for event in events[:4]:
+            yield event
+        # Longer than the window: the pending delta must go out before the rest
+        await asyncio.sleep(0.1)
+        for event in events[4:]:
+            yield event
+
+    async def collect():
+        return [event async for event in coalesce_deltas(upstream(), window_ms=20, max_bytes=1024)]
+
+    assert contents(asyncio.run(collect())) == [
+        "The", " quick brown", " fox jumps over the", " lazy dog."
+    ]
+
+def test_requested_window_is_clamped():
+    from app.config import STREAM_COALESCE_MAX_WINDOW_MS
+    from app.routers.openai import resolve_coalesce_window
+
+    assert resolve_coalesce_window(None, "600000") == STREAM_COALESCE_MAX_WINDOW_MS
+    assert resolve_coalesce_window(10 * STREAM_COALESCE_MAX_WINDOW_MS, None) == STREAM_COALESCE_MAX_WINDOW_MS
+    assert resolve_coalesce_window(None, "10") == 10
+    assert resolve_coalesce_window(30, "off") is None
+
+def test_model_window_applies_only_when_coalescing_is_enabled():
+    from app.config import ConfigFile, ConfigSnapshot, STREAM_COALESCE_WINDOW_MS
+
+    config = ConfigFile(
+        providers={"openai": {"p": {"api_key": "k", "api_endpoint": "http://upstream", "models": ["m"]}}},
+        proxy_models={
+            "off": {"provider_type": "openai", "provider": "p", "model": "m", "coalesce": False, "coalesce_window_ms": 30},
+            "on": {"provider_type": "openai", "provider": "p", "model": "m", "coalesce": True},
+            "custom": {"provider_type": "openai", "provider": "p", "model": "m", "coalesce": True, "coalesce_window_ms": 20},
+        }
+    )
+    routes = ConfigSnapshot(config, source="test").proxy_models
+
+    assert routes["off"].default_coalesce_window_ms is None
+    assert routes["on"].default_coalesce_window_ms == STREAM_COALESCE_WINDOW_MS
+    assert routes["custom"].default_coalesce_window_ms == 20
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from app import config, env
+from app.config_watcher import try_reload_config
+
+CONFIG = {
+    "providers": {"openai": {"upstream": {
+        "api_key": "provider-key", "api_endpoint": "http://upstream/v1", "models": ["real-model"]
+    }}},
+    "proxy_models": {"file-model:proxy": {"provider_type": "openai", "provider": "upstream", "model": "real-model"}},
+    "proxy_api_keys": ["file-key"]
+}
+
+@pytest.fixture
+def config_file(workdir, monkeypatch):
+    """Point the config at config.json in the test directory and reset the current snapshot"""
+    path = workdir / "config.json"
+    path.write_text(json.dumps(CONFIG))
+    monkeypatch.setattr(config, "CONFIG_FILE", str(path))
+    monkeypatch.setattr(config, "_snapshot", None)
+    return path
+
+def test_missing_file_on_reload_keeps_current_config(config_file):
+    current = config.get_config()
+    assert current.source == str(config_file)
+
+    config_file.unlink()
+    with pytest.raises(FileNotFoundError):
+        config.reload_config()
+
+    assert config.get_config() is current
+    assert "file-model:proxy" in config.get_config().proxy_models
+
+def test_defaults_are_used_without_a_config_file(config_file):
+    config_file.unlink()
+
+    assert config.get_config().source == "defaults"
+    assert config.reload_config().source == "defaults"
+
+def write_config(path, **changes):
+    path.write_text(json.dumps({**CONFIG, **changes}))
+
+def test_reload_swaps_in_a_new_snapshot(config_file):
+    current = config.get_config()
+    write_config(config_file, proxy_models={
+        "other-model:proxy": {"provider_type": "openai", "provider": "upstream", "model": "real-model"}
+    })
+
+    reloaded = config.reload_config()
+
+    assert config.get_config() is reloaded
+    assert list(reloaded.proxy_models) == ["other-model:proxy"]
+    # A request holding the old snapshot keeps seeing the old config
+    assert list(current.proxy_models) == ["file-model:proxy"]
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({**CONFIG, "proxy_models": {"x:proxy": {"provider_type": "openai", "provider": "missing", "model": "m"}}}),
+    json.dumps({**CONFIG, "providers": {"unknown": {}}}),
+])
+def test_invalid_file_on_reload_keeps_current_config(config_file, content):
+    current = config.get_config()
+    config_file.write_text(content)
+
+    assert try_reload_config("test") is None
+    assert config.get_config() is current
+
+@pytest.fixture
+def dotenv(workdir, monkeypatch):
+    """A .env file treated as the one loaded at startup"""
+    path = workdir / ".env"
+    monkeypatch.setattr(env, "_dotenv_path", str(path))
+    # Values loaded from .env at startup are still in the process environment
+    monkeypatch.setattr(env, "_dotenv_keys", frozenset({"PROXY_API_KEYS", "TEST_PROVIDER_KEY"}))
+    monkeypatch.setenv("PROXY_API_KEYS", "old-key")
+    monkeypatch.setenv("TEST_PROVIDER_KEY", "old-provider-key")
+    return path
+
+def test_reload_reads_rotated_keys_from_dotenv(config_file, dotenv):
+    write_config(config_file, providers={"openai": {"upstream": {
+        "api_key_env": "TEST_PROVIDER_KEY", "api_endpoint": "http://upstream/v1", "models": ["real-model"]
+    }}})
+    dotenv.write_text("PROXY_API_KEYS=old-key\nTEST_PROVIDER_KEY=old-provider-key\n")
+    current = config.reload_config()
+
+    dotenv.write_text("PROXY_API_KEYS=new-key\nTEST_PROVIDER_KEY=new-provider-key\n")
+    reloaded = config.reload_config()
+
+    assert reloaded.api_keys == {"new-key", "file-key"}
+    assert reloaded.proxy_models["file-model:proxy"].provider_config.api_key == "new-provider-key"
+    assert current.api_keys == {"old-key", "file-key"}
+    assert current.proxy_models["file-model:proxy"].provider_config.api_key == "old-provider-key"
+
+def test_key_removed_from_dotenv_is_dropped_on_reload(config_file, dotenv):
+    dotenv.write_text("")
+
+    assert config.reload_config().api_keys == {"file-key"}
+
+def test_process_environment_takes_precedence_over_dotenv(config_file, dotenv, monkeypatch):
+    monkeypatch.setattr(env, "_dotenv_keys", frozenset())
+    dotenv.write_text("PROXY_API_KEYS=dotenv-key\n")
+
+    assert config.reload_config().api_keys == {"old-key", "file-key"}
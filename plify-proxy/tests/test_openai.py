@@ -0,0 +1,23 @@
+import json
+
+import httpx
+
+from conftest import API_KEY, PROXY_MODEL
+
+def chat_request(**body):
+    return {"model": PROXY_MODEL, "messages": [{"role": "user", "content": "Hi"}], **body}
+
+def sse_data(text):
+    return [json.loads(line[6:]) for line in text.splitlines() if line.startswith("data: {")]
+
+def test_stream_reports_provider_error_in_openai_format(client, upstream):
+    upstream(lambda request: httpx.Response(429, json={"error": {"message": "Rate limit reached"}}))
+
+    response = client.post(
+        "/oai/v1/chat/completions",
+        headers={"X-API-KEY": API_KEY},
+        json=chat_request(stream=True)
+    )
+
+    assert response.status_code == 200
+    assert sse_data(response.text) == [{"error": {"message": "Rate limit reached", "code": "429"}}]
@@ -0,0 +1,56 @@
+import json
+import queue
+
+import pytest
+
+from app import timing
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """Fresh export queue and thread state, restored after the test"""
+    monkeypatch.setattr(timing, "_export_queue", queue.Queue(maxsize=1024))
+    monkeypatch.setattr(timing, "_export_thread", None)
+    monkeypatch.setattr(timing, "_export_disabled", False)
+
+def finished_timings(trace_id="trace"):
+    timings = timing.RequestTimings(trace_id)
+    with timings.span("auth"):
+        pass
+    timings.finish()
+    return timings
+
+def test_export_writes_one_otlp_line_per_request(exporter, monkeypatch, tmp_path):
+    path = tmp_path / "spans" / "spans.jsonl"
+    monkeypatch.setattr(timing, "TIMING_EXPORT_FILE", str(path))
+
+    for i in range(3):
+        timing.export(finished_timings(f"trace-{i}"))
+    timing._stop_export_thread()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 3
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["request", "auth"]
+
+def test_unopenable_export_file_disables_export(exporter, monkeypatch):
+    monkeypatch.setattr(timing, "TIMING_EXPORT_FILE", "/proc/nope/spans.jsonl")
+
+    timing.export(finished_timings())
+    timing._export_thread.join(timeout=5)
+    for _ in range(1000):
+        timing.export(finished_timings())
+
+    assert not timing._export_thread.is_alive()
+    assert timing._export_disabled
+    assert timing._export_queue.empty()
+
+def test_export_drops_spans_when_the_queue_is_full(exporter, monkeypatch, tmp_path):
+    monkeypatch.setattr(timing, "TIMING_EXPORT_FILE", str(tmp_path / "spans.jsonl"))
+    monkeypatch.setattr(timing, "_export_queue", queue.Queue(maxsize=2))
+    # Pretend the writer is running but stuck
+    monkeypatch.setattr(timing, "_export_thread", object())
+
+    for _ in range(5):
+        timing.export(finished_timings())
+
+    assert timing._export_queue.qsize() == 2
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+
+import httpx
+
+from app.routers import ws as ws_router
+from app.routers.ws import StreamCredit
+from conftest import API_KEY, PROXY_MODEL
+
+WS_PATH = "/oai/v1/ws"
+
+def connect(client):
+    return client.websocket_connect(WS_PATH, headers={"X-API-KEY": API_KEY})
+
+def chunk(text):
+    return {
+        "object": "chat.completion.chunk",
+        "model": "real-model",
+        "choices": [{"index": 0, "delta": {"content": text}}]
+    }
+
+def streaming_upstream(texts, hold=0, closed=None):
+    """Provider handler streaming one chunk per text, then pausing `hold` seconds before [DONE]"""
+    async def body():
+        try:
+            for text in texts:
+                yield f"data: {json.dumps(chunk(text))}\n\n".encode()
+            await asyncio.sleep(hold)
+            yield b"data: [DONE]\n\n"
+        finally:
+            if closed is not None:
+                closed.set()
+
+    def handler(request):
+        return httpx.Response(200, content=body(), headers={"Content-Type": "text/event-stream"})
+    return handler
+
+def request_message(stream_id, **options):
+    return {
+        "type": "request",
+        "id": stream_id,
+        "body": {"model": PROXY_MODEL, "messages": [{"role": "user", "content": "Hi"}]},
+        **options
+    }
+
+def content(message):
+    return message["data"]["choices"][0]["delta"]["content"]
+
+def test_binary_message_is_rejected_without_closing(client):
+    with connect(client) as ws:
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_bytes(b"xx")
+        error = ws.receive_json()
+        assert (error["type"], error["code"]) == ("error", "invalid_message")
+
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+def test_binary_auth_message_is_rejected(client):
+    with client.websocket_connect(WS_PATH) as ws:
+        ws.send_bytes(b"xx")
+        message = ws.receive()
+        assert message["type"] == "websocket.close"
+        assert message["code"] == 1008
+
+def test_stream_chunks_are_tagged_and_mapped_to_the_proxy_model(client, upstream):
+    upstream(streaming_upstream(["Hel", "lo"]))
+    with connect(client) as ws:
+        ws.receive_json()
+        ws.send_json(request_message("s1"))
+
+        first, second, done = ws.receive_json(), ws.receive_json(), ws.receive_json()
+
+    assert [(m["type"], m["id"]) for m in (first, second, done)] == [("chunk", "s1"), ("chunk", "s1"), ("done", "s1")]
+    assert [content(first), content(second)] == ["Hel", "lo"]
+    assert first["data"]["model"] == PROXY_MODEL
+
+def test_stream_pauses_when_out_of_credit(client, upstream):
+    upstream(streaming_upstream(["a", "b", "c", "d", "e"]))
+    with connect(client) as ws:
+        ws.receive_json()
+        ws.send_json(request_message("s1", window=2))
+        assert [content(ws.receive_json()) for _ in range(2)] == ["a", "b"]
+
+        # The stream is blocked on credit, so the pong is the next message
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+        ws.send_json({"type": "credit", "id": "s1", "credit": 3})
+        assert [content(ws.receive_json()) for _ in range(3)] == ["c", "d", "e"]
+        assert ws.receive_json()["type"] == "done"
+
+def test_credit_is_capped():
+    credit = StreamCredit(10**9, limit=16)
+    assert credit.available == 16
+
+    credit.grant(10**9)
+    assert credit.available == 16
+    credit.grant(-5)
+    assert credit.available == 16
+
+def test_cancel_stops_the_stream_and_closes_the_upstream_request(client, upstream):
+    closed = threading.Event()
+    upstream(streaming_upstream(["a"], hold=5, closed=closed))
+    with connect(client) as ws:
+        ws.receive_json()
+        ws.send_json(request_message("s1"))
+        assert content(ws.receive_json()) == "a"
+
+        ws.send_json({"type": "cancel", "id": "s1"})
+        assert ws.receive_json() == {"type": "cancelled", "id": "s1"}
+        assert closed.wait(timeout=5)
+
+        # The ID is free again once the stream is cancelled
+        ws.send_json(request_message("s1"))
+        assert ws.receive_json()["type"] == "chunk"
+
+def test_duplicate_stream_id_is_rejected(client, upstream):
+    upstream(streaming_upstream(["a"], hold=5))
+    with connect(client) as ws:
+        ws.receive_json()
+        ws.send_json(request_message("s1"))
+        assert ws.receive_json()["type"] == "chunk"
+
+        ws.send_json(request_message("s1"))
+        error = ws.receive_json()
+        assert (error["type"], error["id"], error["code"]) == ("error", "s1", "duplicate_stream")
+
+def test_streams_beyond_the_limit_are_rejected(client, upstream, monkeypatch):
+    monkeypatch.setattr(ws_router, "WS_MAX_STREAMS", 2)
+    upstream(streaming_upstream(["a"], hold=5))
+    with connect(client) as ws:
+        ws.receive_json()
+        ws.send_json(request_message("s1"))
+        ws.send_json(request_message("s2"))
+        assert {ws.receive_json()["id"] for _ in range(2)} == {"s1", "s2"}
+
+        ws.send_json(request_message("s3"))
+        error = ws.receive_json()
+        assert (error["type"], error["id"], error["code"]) == ("error", "s3", "too_many_streams")